@@ -2,9 +2,101 @@
 作者修改品質評分模組
 基於 Git commit 行為評估作者的修改品質
 """
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
 from typing import Dict, Any, List
 
 
+# 評分分段表
+# 「>= 門檻」型的分段使用 bisect_right，「<= 門檻」型的分段使用 bisect_left，
+# 取得的索引直接對應分數表，取代逐段 if/elif 判斷
+# 各維度分數表的最高分相加恰為該維度滿分（40/30/30），因此不需再另外設上限
+
+# 平均每 commit 修改檔案數：0.5、1 為下限含等號，3、6、10、15 為上限含等號
+_AVG_FILES_LOWER_BINS = (0.5, 1.0)
+_AVG_FILES_UPPER_BINS = (3.0, 6.0, 10.0, 15.0)
+_AVG_FILES_POINTS = (5, 15, 20, 18, 15, 10, 5)
+
+# 距離最近一次 commit 天數（<= 門檻）
+_DAYS_SINCE_BINS = (30, 90)
+_DAYS_SINCE_POINTS = (5, 3, 1)
+
+# 平均 commit message 長度（>= 門檻）
+_MSG_LENGTH_BINS = (10, 20)
+_MSG_LENGTH_POINTS = (5, 11, 15)
+
+# 修改範圍廣度（>= 門檻）
+_SCOPE_FILES_BINS = (5, 15, 30, 50)
+_SCOPE_FILES_POINTS = (1, 3, 5, 7, 8)
+
+# 程式碼變動規模（>= 門檻）
+_TOTAL_CHANGES_BINS = (500, 2000, 5000, 10000)
+_TOTAL_CHANGES_POINTS = (1, 2, 4, 6, 7)
+
+# 快速返工比例（<= 門檻）
+_REWORK_RATIO_BINS = (10, 20, 30, 50)
+_REWORK_RATIO_POINTS = (15, 12, 9, 5, 2)
+
+# 修改檔案總數（>= 門檻）
+_ACTIVITY_FILES_BINS = (10, 30, 50)
+_ACTIVITY_FILES_POINTS = (3, 6, 8, 10)
+
+# 活躍時間跨度（>= 門檻）
+_ACTIVE_DAYS_BINS = (30, 90, 180)
+_ACTIVE_DAYS_POINTS = (3, 6, 8, 10)
+
+# 專案貢獻比例（>= 門檻）
+_CONTRIBUTION_BINS = (5, 15, 30)
+_CONTRIBUTION_POINTS = (3, 6, 8, 10)
+
+# 等級門檻（>= 門檻）
+_GRADE_BINS = (60, 70, 80, 90)
+_GRADES = 'DCBAS'
+
+# 等級描述
+_GRADE_DESCRIPTIONS = {
+    'S': '卓越 - 優秀的程式碼品質與工作習慣',
+    'A': '優秀 - 良好的程式碼品質與穩定的貢獻',
+    'B': '良好 - 符合團隊標準，有改善空間',
+    'C': '普通 - 建議加強程式碼習慣與規範',
+    'D': '需改善 - 需要指導與協助'
+}
+
+
+@dataclass
+class AuthorScore:
+    """作者評分結果"""
+    __slots__ = ('author', 'total_score', 'grade', 'commit_behavior',
+                 'quality_and_scope', 'activity', 'metrics')
+
+    author: str  # 作者名稱
+    total_score: float  # 總分（0-100）
+    grade: str  # 等級（S/A/B/C/D）
+    commit_behavior: float  # Commit 行為品質分數（0-40）
+    quality_and_scope: float  # 工作品質與範圍分數（0-30）
+    activity: float  # 活躍度與影響力分數（0-30）
+    metrics: Dict[str, Any]  # 評分所依據的作者資料
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        轉換為 API 回傳使用的字典格式
+
+        Returns:
+            作者評分字典（各維度分數置於 scores 之下）
+        """
+        return {
+            'author': self.author,
+            'total_score': self.total_score,
+            'grade': self.grade,
+            'scores': {
+                'commit_behavior': self.commit_behavior,
+                'quality_and_scope': self.quality_and_scope,
+                'activity': self.activity
+            },
+            'metrics': self.metrics
+        }
+
+
 class AuthorQualityScorer:
     """作者品質評分器"""
 
@@ -12,7 +104,7 @@ class AuthorQualityScorer:
         """初始化評分器"""
         pass
 
-    def calculate_scores(self, author_quality_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def calculate_scores(self, author_quality_data: Dict[str, Any]) -> List[AuthorScore]:
         """
         計算所有作者的品質評分
 
@@ -36,20 +128,19 @@ class AuthorQualityScorer:
             # 判定等級
             grade = self._determine_grade(total_score)
 
-            scored_authors.append({
-                'author': author,
-                'total_score': round(total_score, 1),
-                'grade': grade,
-                'scores': {
-                    'commit_behavior': round(commit_behavior_score, 1),
-                    'quality_and_scope': round(quality_and_scope_score, 1),
-                    'activity': round(activity_score, 1)
-                },
-                'metrics': data
-            })
+            # 各項分數皆為分數表中的整數，加總後不需再四捨五入
+            scored_authors.append(AuthorScore(
+                author=author,
+                total_score=total_score,
+                grade=grade,
+                commit_behavior=commit_behavior_score,
+                quality_and_scope=quality_and_scope_score,
+                activity=activity_score,
+                metrics=data
+            ))
 
         # 按總分排序
-        scored_authors.sort(key=lambda x: x['total_score'], reverse=True)
+        scored_authors.sort(key=lambda x: x.total_score, reverse=True)
 
         return scored_authors
 
@@ -63,42 +154,30 @@ class AuthorQualityScorer:
         Returns:
             Commit 行為品質分數（0-40）
         """
+        # 一次取出評分所需的指標
+        avg_files = data.get('avg_files_per_commit', 0)
+        days_since_last = data.get('days_since_last_commit', 999)
+        avg_msg_length = data.get('avg_message_length', 0)
+
         score = 0.0
 
         # 1. 平均每 commit 修改檔案數（20分，從15分提升）
         # 考量：一般是一個功能/模組 = 一個檔案，新增功能可能涉及多個檔案（介面、類別、物件）
-        avg_files = data.get('avg_files_per_commit', 0)
-        if 1 <= avg_files <= 3:
-            score += 20  # 最佳（一般維護或小功能）
-        elif (3 < avg_files <= 6):
-            score += 18  # 優秀（新增功能含多個檔案）
-        elif (0.5 <= avg_files < 1) or (6 < avg_files <= 10):
-            score += 15  # 良好
-        elif (10 < avg_files <= 15):
-            score += 10  # 普通（可能是較大功能或重構）
-        else:
-            score += 5   # 需改善（過於碎片或散彈式修改）
+        # 1-3 個：20（最佳）、3-6 個：18（優秀）、0.5-1 或 6-10 個：15（良好）、
+        # 10-15 個：10（普通）、其他：5（過於碎片或散彈式修改）
+        score += _AVG_FILES_POINTS[bisect_right(_AVG_FILES_LOWER_BINS, avg_files)
+                                   + bisect_left(_AVG_FILES_UPPER_BINS, avg_files)]
 
         # 2. 最近活躍度（5分，從15分降低）
         # 考量：專案可能有開發期/維護期，不應過度懲罰維護期專案
-        days_since_last = data.get('days_since_last_commit', 999)
-        if days_since_last <= 30:
-            score += 5   # 最近活躍（30天內有 commit）
-        elif days_since_last <= 90:
-            score += 3   # 間歇活躍（90天內有 commit）
-        else:
-            score += 1   # 長期沒活動（超過90天）
+        # 30天內：5、90天內：3、超過90天：1
+        score += _DAYS_SINCE_POINTS[bisect_left(_DAYS_SINCE_BINS, days_since_last)]
 
         # 3. Commit message 品質（15分，從10分提升）
-        avg_msg_length = data.get('avg_message_length', 0)
-        if avg_msg_length >= 20:
-            score += 15  # 最佳
-        elif avg_msg_length >= 10:
-            score += 11  # 良好
-        else:
-            score += 5   # 需改善
+        # >= 20字元：15、>= 10字元：11、其他：5
+        score += _MSG_LENGTH_POINTS[bisect_right(_MSG_LENGTH_BINS, avg_msg_length)]
 
-        return min(score, 40.0)  # 確保不超過40分
+        return score
 
     def _score_quality_and_scope(self, data: Dict[str, Any]) -> float:
         """
@@ -110,49 +189,27 @@ class AuthorQualityScorer:
         Returns:
             工作品質與範圍分數（0-30）
         """
+        # 一次取出評分所需的指標
+        files_modified = data.get('files_modified', 0)
+        total_changes = data.get('total_code_changes', 0)
+        rapid_rework_ratio = data.get('rapid_rework_ratio', 0)
+
         score = 0.0
 
         # 1. 修改範圍廣度（8分）- 修改不同檔案數量
-        files_modified = data.get('files_modified', 0)
-        if files_modified >= 50:
-            score += 8   # 廣泛
-        elif files_modified >= 30:
-            score += 7   # 良好
-        elif files_modified >= 15:
-            score += 5   # 普通
-        elif files_modified >= 5:
-            score += 3   # 範圍較窄
-        else:
-            score += 1   # 專注於少數檔案
+        # >= 50：8、>= 30：7、>= 15：5、>= 5：3、其他：1
+        score += _SCOPE_FILES_POINTS[bisect_right(_SCOPE_FILES_BINS, files_modified)]
 
         # 2. 程式碼變動規模（7分）- 總插入+刪除行數
-        total_changes = data.get('total_code_changes', 0)
-        if total_changes >= 10000:
-            score += 7   # 大規模變動
-        elif total_changes >= 5000:
-            score += 6   # 中等規模
-        elif total_changes >= 2000:
-            score += 4   # 一般規模
-        elif total_changes >= 500:
-            score += 2   # 小規模
-        else:
-            score += 1   # 微小變動
+        # >= 10000：7、>= 5000：6、>= 2000：4、>= 500：2、其他：1
+        score += _TOTAL_CHANGES_POINTS[bisect_right(_TOTAL_CHANGES_BINS, total_changes)]
 
         # 3. 修改品質穩定性（15分）⭐ 核心指標
         # 評估短時間內反覆修改同一檔案的比例
-        rapid_rework_ratio = data.get('rapid_rework_ratio', 0)
-        if rapid_rework_ratio <= 10:
-            score += 15  # 優秀品質（快速返工比例 <= 10%）
-        elif rapid_rework_ratio <= 20:
-            score += 12  # 良好品質
-        elif rapid_rework_ratio <= 30:
-            score += 9   # 普通品質
-        elif rapid_rework_ratio <= 50:
-            score += 5   # 需改善
-        else:
-            score += 2   # 品質問題嚴重（快速返工比例 > 50%）
-
-        return min(score, 30.0)  # 確保不超過30分
+        # <= 10%：15、<= 20%：12、<= 30%：9、<= 50%：5、> 50%：2
+        score += _REWORK_RATIO_POINTS[bisect_left(_REWORK_RATIO_BINS, rapid_rework_ratio)]
+
+        return score
 
     def _score_activity(self, data: Dict[str, Any]) -> float:
         """
@@ -164,42 +221,26 @@ class AuthorQualityScorer:
         Returns:
             活躍度分數（0-30）
         """
+        # 一次取出評分所需的指標
+        files_modified = data.get('files_modified', 0)
+        active_days = data.get('active_days', 0)
+        contribution_ratio = data.get('contribution_ratio', 0)
+
         score = 0.0
 
         # 1. 修改檔案總數（10分）
-        files_modified = data.get('files_modified', 0)
-        if files_modified >= 50:
-            score += 10  # 廣泛影響
-        elif files_modified >= 30:
-            score += 8   # 良好
-        elif files_modified >= 10:
-            score += 6   # 普通
-        else:
-            score += 3   # 較少
+        # >= 50：10、>= 30：8、>= 10：6、其他：3
+        score += _ACTIVITY_FILES_POINTS[bisect_right(_ACTIVITY_FILES_BINS, files_modified)]
 
         # 2. 活躍時間跨度（10分）
-        active_days = data.get('active_days', 0)
-        if active_days >= 180:     # 半年以上
-            score += 10
-        elif active_days >= 90:    # 3個月以上
-            score += 8
-        elif active_days >= 30:    # 1個月以上
-            score += 6
-        else:
-            score += 3
+        # 半年以上：10、3個月以上：8、1個月以上：6、其他：3
+        score += _ACTIVE_DAYS_POINTS[bisect_right(_ACTIVE_DAYS_BINS, active_days)]
 
         # 3. 專案貢獻比例（10分）
-        contribution_ratio = data.get('contribution_ratio', 0)
-        if contribution_ratio >= 30:
-            score += 10  # 核心貢獻者
-        elif contribution_ratio >= 15:
-            score += 8   # 主要貢獻者
-        elif contribution_ratio >= 5:
-            score += 6   # 一般貢獻者
-        else:
-            score += 3   # 偶爾貢獻
+        # >= 30%：10（核心）、>= 15%：8（主要）、>= 5%：6（一般）、其他：3（偶爾）
+        score += _CONTRIBUTION_POINTS[bisect_right(_CONTRIBUTION_BINS, contribution_ratio)]
 
-        return min(score, 30.0)  # 確保不超過30分
+        return score
 
     def _determine_grade(self, total_score: float) -> str:
         """
@@ -211,16 +252,7 @@ class AuthorQualityScorer:
         Returns:
             等級（S/A/B/C/D）
         """
-        if total_score >= 90:
-            return 'S'
-        elif total_score >= 80:
-            return 'A'
-        elif total_score >= 70:
-            return 'B'
-        elif total_score >= 60:
-            return 'C'
-        else:
-            return 'D'
+        return _GRADES[bisect_right(_GRADE_BINS, total_score)]
 
     def get_grade_description(self, grade: str) -> str:
         """
@@ -232,11 +264,4 @@ class AuthorQualityScorer:
         Returns:
             等級描述
         """
-        descriptions = {
-            'S': '卓越 - 優秀的程式碼品質與工作習慣',
-            'A': '優秀 - 良好的程式碼品質與穩定的貢獻',
-            'B': '良好 - 符合團隊標準，有改善空間',
-            'C': '普通 - 建議加強程式碼習慣與規範',
-            'D': '需改善 - 需要指導與協助'
-        }
-        return descriptions.get(grade, '未知')
+        return _GRADE_DESCRIPTIONS.get(grade, '未知')
@@ -2,12 +2,92 @@
 程式碼分析模組
 使用 Lizard 分析專案程式碼的行數、檔案數量、複雜度等指標
 """
+import multiprocessing
 import os
+import re
+import sys
+import threading
 import lizard
-from typing import Dict, List, Any
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from heapq import nlargest
+from itertools import islice
+from typing import Dict, List, Any, Optional
 from pathlib import Path
 
 
+# 複雜度分佈分段（平均複雜度 <= 門檻）：1-5、6-10、11-20、> 20
+_COMPLEXITY_DISTRIBUTION_BINS = (5, 10, 20)
+_COMPLEXITY_DISTRIBUTION_KEYS = ('low', 'medium', 'high', 'very_high')
+
+# 平行分析時每個子行程一次處理的檔案數
+_ANALYZE_CHUNK_SIZE = 32
+
+# 平行分析時每個子行程至少負責的檔案數
+# （spawn 子行程啟動時需重新匯入主程式模組，約需一秒，檔案太少時反而比單一行程慢）
+_MIN_FILES_PER_WORKER = 256
+
+# Windows 上 ProcessPoolExecutor 的子行程數上限
+_WINDOWS_MAX_WORKERS = 61
+
+# 各次分析共用的子行程池（避免每次分析都重新啟動子行程、重新匯入主程式模組）
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _max_workers() -> int:
+    """取得平行分析可使用的子行程數上限"""
+    workers = os.cpu_count() or 1
+    if sys.platform == 'win32':
+        workers = min(workers, _WINDOWS_MAX_WORKERS)
+    return workers
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """取得共用的子行程池，尚未建立時才建立"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 分析在 FastAPI 的執行緒中進行，fork 會複製其他執行緒持有的鎖，改用 spawn 建立子行程
+            _executor = ProcessPoolExecutor(
+                max_workers=_max_workers(), mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor):
+    """捨棄已損壞的子行程池，下次分析時重新建立"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def shutdown_executor():
+    """關閉共用的子行程池（應用程式結束時呼叫）"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def _analyze_source_files(file_paths: List[str]) -> List[Any]:
+    """
+    使用 Lizard 分析一批檔案（於子行程中執行）
+
+    Args:
+        file_paths: 檔案路徑列表
+
+    Returns:
+        Lizard 檔案分析結果列表
+    """
+    return [lizard.analyze_file(file_path) for file_path in file_paths]
+
+
 class CodeAnalyzer:
     """程式碼分析器"""
 
@@ -52,6 +132,18 @@ class CodeAnalyzer:
             self.exclude_files = self.DEFAULT_EXCLUDE_FILES.copy()
             self.exclude_files.extend(exclude_files)
 
+        # 預先整理排除資料夾集合
+        self._exclude_folder_set = frozenset(
+            folder.strip() for folder in self.exclude_folders if folder.strip()
+        )
+
+        # 將排除檔案規則編譯成單一正規表示式（任一規則出現在路徑中即排除）
+        exclude_file_terms = [term.strip() for term in self.exclude_files if term.strip()]
+        self._exclude_file_re = (
+            re.compile('|'.join(map(re.escape, exclude_file_terms)))
+            if exclude_file_terms else None
+        )
+
         self.progress_tracker = progress_tracker
 
     def analyze(self) -> Dict[str, Any]:
@@ -61,13 +153,14 @@ class CodeAnalyzer:
         Returns:
             包含分析結果的字典
         """
-        # 使用 Lizard 分析專案
-        # 改進：使用絕對路徑並遞迴分析所有子目錄
-        analysis = lizard.analyze(
-            paths=[str(self.project_path.absolute())],
-            exclude_pattern=r"(?:^|[\\/])(node_modules|\.git|__pycache__|dist|build|env|\.idea|\.vscode)(?:[\\/]|$)",  # 只保留最基本的排除
-            exts=lizard.get_extensions([])  # 支援所有語言
-        )
+        # 列出專案中需要分析的原始碼檔案（使用絕對路徑並遞迴所有子目錄），
+        # 排除的資料夾與檔案在交給 Lizard 解析前就先略過
+        root_path = str(self.project_path.absolute())
+        source_files = self._list_source_files(root_path)
+
+        # 列出的檔案都位於專案根目錄下，相對路徑直接截去根目錄前綴即可
+        root_prefix = os.path.join(root_path, '')
+        root_prefix_len = len(root_prefix)
 
         # 統計資訊
         total_lines = 0
@@ -80,16 +173,13 @@ class CodeAnalyzer:
 
         file_details = []
 
-        # 將分析結果轉換為列表以計算總數
-        analysis_list = list(analysis)
-        total_to_process = len(analysis_list)
-        processed = 0
+        # 複雜度分佈（在同一個迴圈中累計，不需再次走訪 file_details）
+        complexity_distribution = dict.fromkeys(_COMPLEXITY_DISTRIBUTION_KEYS, 0)
 
-        for file_info in analysis_list:
-            # 檢查是否應該排除此檔案（排除資料夾和排除檔案）
-            if self._is_excluded_file(file_info.filename) or self._is_excluded_folder(file_info.filename):
-                continue
+        total_to_process = len(source_files)
+        processed = 0
 
+        for file_info in self._analyze_files(source_files):
             total_files += 1
             total_lines += file_info.nloc
             total_nloc += file_info.nloc
@@ -99,26 +189,35 @@ class CodeAnalyzer:
             total_functions += file_functions
 
             for func in file_info.function_list:
-                complexity_sum += func.cyclomatic_complexity
-                file_complexity += func.cyclomatic_complexity
+                func_complexity = func.cyclomatic_complexity
+                file_complexity += func_complexity
 
-                if func.cyclomatic_complexity > max_complexity:
-                    max_complexity = func.cyclomatic_complexity
+                if func_complexity > max_complexity:
+                    max_complexity = func_complexity
                     max_complexity_function = {
                         'name': func.name,
                         'file': file_info.filename,
-                        'complexity': func.cyclomatic_complexity,
+                        'complexity': func_complexity,
                         'line': func.start_line
                     }
+            complexity_sum += file_complexity
 
             # 檔案詳細資訊
+            file_avg_complexity = round(file_complexity / file_functions, 2) if file_functions > 0 else 0
+            filename = file_info.filename
+            if filename.startswith(root_prefix):
+                relative_filename = filename[root_prefix_len:]
+            else:
+                relative_filename = os.path.relpath(filename, self.project_path)
             file_details.append({
-                'filename': os.path.relpath(file_info.filename, self.project_path),
+                'filename': relative_filename,
                 'nloc': file_info.nloc,
                 'functions': file_functions,
                 'complexity': file_complexity,
-                'avg_complexity': round(file_complexity / file_functions, 2) if file_functions > 0 else 0
+                'avg_complexity': file_avg_complexity
             })
+            complexity_distribution[_COMPLEXITY_DISTRIBUTION_KEYS[
+                bisect_left(_COMPLEXITY_DISTRIBUTION_BINS, file_avg_complexity)]] += 1
 
             # 更新進度
             processed += 1
@@ -130,14 +229,15 @@ class CodeAnalyzer:
                         "code_analysis",
                         progress_percentage,
                         100,
-                        f"正在分析程式碼... ({processed}/{total_to_process} 檔案)"
+                        f"正在分析程式碼... ({processed}/{total_to_process} 檔案)",
+                        force=processed == total_to_process
                     )
 
         # 計算平均複雜度
         avg_complexity = round(complexity_sum / total_functions, 2) if total_functions > 0 else 0
 
-        # 依複雜度排序檔案
-        file_details_sorted = sorted(file_details, key=lambda x: x['complexity'], reverse=True)
+        # 依複雜度取出前50個最複雜的檔案（不需排序全部檔案）
+        top_complex_files = nlargest(50, file_details, key=lambda x: x['complexity'])
 
         return {
             'summary': {
@@ -149,94 +249,150 @@ class CodeAnalyzer:
                 'max_complexity': max_complexity,
                 'max_complexity_function': max_complexity_function
             },
-            'files': file_details_sorted[:50],  # 只返回前50個最複雜的檔案
-            'complexity_distribution': self._get_complexity_distribution(file_details)
+            'files': top_complex_files,  # 只返回前50個最複雜的檔案
+            'complexity_distribution': complexity_distribution
         }
 
-    def _is_excluded_folder(self, file_path: str) -> bool:
+    def _list_source_files(self, root_path: str) -> List[str]:
         """
-        檢查檔案路徑是否包含應該被排除的資料夾
+        列出專案中 Lizard 支援、未被排除且內容不重複的原始碼檔案
 
         Args:
-            file_path: 檔案完整路徑
+            root_path: 專案根目錄絕對路徑
 
         Returns:
-            True 如果該檔案在排除的資料夾中
+            原始碼檔案路徑列表
         """
-        if not self.exclude_folders:
-            return False
+        # 專案根目錄本身位於排除的資料夾中時，所有檔案都會被排除
+        if self._is_excluded_folder(root_path):
+            return []
+
+        source_files = []
+        seen_hashes = set()  # 已列出檔案的 md5（與 Lizard 相同，內容重複的檔案只分析一次）
+        for dir_path, file_names in self._walk_bottom_up(root_path):
+            for file_name in file_names:
+                if file_name in self._exclude_folder_set:
+                    continue
+
+                file_path = os.path.join(dir_path, file_name)
+                if not lizard.get_reader_for(file_path) or self._is_excluded_file(file_path):
+                    continue
+
+                # 在排除判斷之後才去重，避免被排除的複本讓專案內的檔案被略過
+                file_hash = lizard.md5_hash_file(file_path)
+                if file_hash:
+                    if file_hash in seen_hashes:
+                        continue
+                    seen_hashes.add(file_hash)
+                source_files.append(file_path)
+
+        return source_files
+
+    def _walk_bottom_up(self, root_path: str):
+        """
+        依 Lizard 的順序（os.walk 的 topdown=False）產出各資料夾的檔案，並略過排除的資料夾
 
-        # 標準化路徑（統一使用正斜線）
-        normalized_path = file_path.replace('\\', '/')
+        topdown=False 無法在走訪時略過資料夾，因此先以 topdown 走訪並剪除排除的資料夾，
+        再依子資料夾在前、父資料夾在後的順序產出，讓重複檔案的保留與檔案順序都與 Lizard 相同
 
-        # 將路徑分割成各個部分
-        path_parts = normalized_path.split('/')
+        Args:
+            root_path: 專案根目錄絕對路徑
 
-        # 檢查路徑中是否包含排除的資料夾名稱
-        for exclude_folder in self.exclude_folders:
-            exclude_folder = exclude_folder.strip()
-            if not exclude_folder:
+        Yields:
+            (資料夾路徑, 檔案名稱列表)
+        """
+        tree = {}  # 資料夾路徑 -> (子資料夾路徑列表, 檔案名稱列表)
+        for dir_path, dir_names, file_names in os.walk(root_path):
+            # 不進入排除的資料夾
+            dir_names[:] = [name for name in dir_names if name not in self._exclude_folder_set]
+            tree[dir_path] = ([os.path.join(dir_path, name) for name in dir_names], file_names)
+
+        # 以堆疊做後序走訪，避免資料夾層數過深時遞迴超過上限
+        stack = [(root_path, False)]
+        while stack:
+            dir_path, children_done = stack.pop()
+            if dir_path not in tree:  # 無法讀取或未進入的資料夾（例如資料夾連結）
                 continue
+            sub_dirs, file_names = tree[dir_path]
+            if children_done:
+                yield dir_path, file_names
+            else:
+                stack.append((dir_path, True))
+                stack.extend((sub_dir, False) for sub_dir in reversed(sub_dirs))
 
-            # 檢查資料夾名稱是否完整匹配路徑的某一部分
-            if exclude_folder in path_parts:
-                return True
+    def _analyze_files(self, source_files: List[str]):
+        """
+        以多個行程平行分析檔案，並依原始順序逐一產出分析結果
 
-        return False
+        Args:
+            source_files: 原始碼檔案路徑列表
 
-    def _is_excluded_file(self, file_path: str) -> bool:
+        Yields:
+            Lizard 檔案分析結果
         """
-        檢查檔案是否應該被排除
+        workers = min(_max_workers(), len(source_files) // _MIN_FILES_PER_WORKER)
+
+        # 檔案不多時直接在目前行程分析，省去建立子行程的成本
+        if workers <= 1:
+            yield from map(lizard.analyze_file, source_files)
+            return
+
+        chunks = iter([
+            source_files[i:i + _ANALYZE_CHUNK_SIZE]
+            for i in range(0, len(source_files), _ANALYZE_CHUNK_SIZE)
+        ])
+
+        # 子行程池由各次分析共用，同時最多只送出 workers 批，讓本次分析只佔用 workers 個子行程
+        executor = _get_executor()
+        pending = deque(
+            executor.submit(_analyze_source_files, chunk) for chunk in islice(chunks, workers)
+        )
+        try:
+            while pending:
+                file_infos = pending.popleft().result()
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    pending.append(executor.submit(_analyze_source_files, chunk))
+                yield from file_infos
+        except BrokenProcessPool:
+            _discard_executor(executor)
+            raise
+        finally:
+            # 分析中途結束時取消尚未開始的批次
+            for future in pending:
+                future.cancel()
+
+    def _is_excluded_folder(self, file_path: str) -> bool:
+        """
+        檢查檔案路徑是否包含應該被排除的資料夾
 
         Args:
             file_path: 檔案完整路徑
 
         Returns:
-            True 如果該檔案應該被排除
+            True 如果該檔案在排除的資料夾中
         """
-        if not self.exclude_files:
+        if not self._exclude_folder_set:
             return False
 
-        # 取得檔案名稱
-        file_name = os.path.basename(file_path)
+        # 標準化路徑（統一使用正斜線）並分割成各個部分
+        path_parts = file_path.replace('\\', '/').split('/')
 
-        # 檢查是否在排除列表中
-        for exclude in self.exclude_files:
-            exclude = exclude.strip()
-            if not exclude:
-                continue
-            # 支援完整檔名匹配或路徑包含匹配
-            if exclude == file_name or exclude in file_path:
-                return True
-
-        return False
+        # 檢查資料夾名稱是否完整匹配路徑的某一部分
+        return not self._exclude_folder_set.isdisjoint(path_parts)
 
-    def _get_complexity_distribution(self, file_details: List[Dict]) -> Dict[str, int]:
+    def _is_excluded_file(self, file_path: str) -> bool:
         """
-        計算複雜度分佈
+        檢查檔案是否應該被排除
 
         Args:
-            file_details: 檔案詳細資訊列表
+            file_path: 檔案完整路徑
 
         Returns:
-            複雜度分佈統計
+            True 如果該檔案應該被排除
         """
-        distribution = {
-            'low': 0,       # 複雜度 1-5
-            'medium': 0,    # 複雜度 6-10
-            'high': 0,      # 複雜度 11-20
-            'very_high': 0  # 複雜度 > 20
-        }
-
-        for file_info in file_details:
-            complexity = file_info['avg_complexity']
-            if complexity <= 5:
-                distribution['low'] += 1
-            elif complexity <= 10:
-                distribution['medium'] += 1
-            elif complexity <= 20:
-                distribution['high'] += 1
-            else:
-                distribution['very_high'] += 1
+        if self._exclude_file_re is None:
+            return False
 
-        return distribution
+        # 支援完整檔名匹配或路徑包含匹配（檔名匹配必然也是路徑包含匹配）
+        return self._exclude_file_re.search(file_path) is not None
@@ -2,12 +2,19 @@
 設定管理模組
 負責儲存和載入使用者的分析設定
 """
+import copy
 import json
 import sys
 import os
+import time
 from pathlib import Path
 from typing import Dict, Any, Optional
-from datetime import datetime
+
+# orjson 為選用套件，未安裝時使用標準函式庫的 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 class ConfigManager:
@@ -30,6 +37,10 @@ class ConfigManager:
 
         self.config_path = app_dir / config_file
 
+        # 設定檔快取（以檔案修改時間判斷是否需要重新讀取）
+        self._cache: Optional[Dict[str, Any]] = None
+        self._cache_mtime = 0
+
     def save_config(self, config_data: Dict[str, Any]) -> bool:
         """
         儲存使用者設定
@@ -41,12 +52,28 @@ class ConfigManager:
             True 如果儲存成功，False 如果失敗
         """
         try:
-            # 加入時間戳記
-            config_data['last_updated'] = datetime.now().isoformat()
-
-            # 寫入 JSON 檔案
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, ensure_ascii=False, indent=2)
+            # 加入時間戳記（本地時間，ISO 8601 格式，精確到秒）
+            config_data['last_updated'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+            if orjson is not None:
+                content = orjson.dumps(config_data, option=orjson.OPT_INDENT_2)
+            else:
+                content = json.dumps(config_data, ensure_ascii=False, indent=2).encode('utf-8')
+
+            # 寫入 JSON 檔案（並使快取失效）
+            # 先寫入暫存檔再取代原檔，避免寫入中斷造成設定檔損毀
+            self._cache = None
+            tmp_path = self.config_path.with_suffix('.json.tmp')
+            try:
+                tmp_path.write_bytes(content)
+                os.replace(tmp_path, self.config_path)
+            except BaseException:
+                # 寫入或取代失敗時移除殘留的暫存檔
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
 
             return True
         except Exception as e:
@@ -61,13 +88,24 @@ class ConfigManager:
             設定資料字典，如果不存在或載入失敗則返回 None
         """
         try:
-            if not self.config_path.exists():
+            try:
+                mtime = self.config_path.stat().st_mtime_ns
+            except FileNotFoundError:
                 return None
 
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
+            # 檔案未變更時直接使用快取（回傳副本以免呼叫端修改到快取）
+            if self._cache is not None and mtime == self._cache_mtime:
+                return copy.deepcopy(self._cache)
+
+            if orjson is not None:
+                config_data = orjson.loads(self.config_path.read_bytes())
+            else:
+                with open(self.config_path, 'r', encoding='utf-8') as f:
+                    config_data = json.load(f)
 
-            return config_data
+            self._cache = config_data
+            self._cache_mtime = mtime
+            return copy.deepcopy(config_data)
         except Exception as e:
             print(f"載入設定失敗: {e}")
             return None
@@ -104,6 +142,7 @@ class ConfigManager:
             True 如果清除成功，False 如果失敗
         """
         try:
+            self._cache = None
             if self.config_path.exists():
                 self.config_path.unlink()
             return True
@@ -3,11 +3,82 @@ Git Log 分析模組
 分析 Git 版本控制歷史，統計檔案異動次數
 """
 import os
+import re
+import subprocess
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from heapq import nlargest
 from typing import Dict, List, Any, Optional
 from pathlib import Path
-from git import Repo, InvalidGitRepositoryError
-from collections import defaultdict
-from datetime import datetime
+from git import Git, Repo, InvalidGitRepositoryError, GitCommandError
+from collections import Counter, defaultdict
+
+
+# git log 輸出格式：\x01 標記 commit 開頭，欄位以 NUL 分隔
+# （commit hash、父節點 hash 列表、作者名稱、commit 時間戳記、完整 commit message）
+_LOG_FORMAT = '%x01%H%x00%P%x00%an%x00%ct%x00%B'
+
+# 串流讀取 git log 輸出時每次讀取的位元組數
+_LOG_READ_SIZE = 65536
+
+# 平行分析時每個 git log 子行程至少負責的 commit 數
+_MIN_COMMITS_PER_WORKER = 500
+
+# 同一檔案兩次修改間隔在此秒數內視為快速返工（5 天）
+_RAPID_REWORK_SECONDS = 5 * 86400
+
+# 排除檔案規則的比對方式：完整檔名、路徑包含、路徑結尾
+_EXCLUDE_MATCH_MODES = ('name', 'contains', 'suffix')
+
+# 支援 --diff-merges=first-parent 的最低 git 版本
+_DIFF_MERGES_MIN_GIT_VERSION = (2, 31)
+
+
+@lru_cache(maxsize=None)
+def _merge_diff_args(git_executable: str) -> tuple:
+    """
+    取得 git log 顯示 merge commit 異動的參數（每個 git 執行檔只偵測一次版本）
+
+    Args:
+        git_executable: GitPython 設定的 git 執行檔
+
+    Returns:
+        git 支援時為 ('--diff-merges=first-parent',)；舊版 git 回傳空 tuple，
+        此時 git log 不輸出 merge commit 的異動，需另外與第一個父節點比較
+    """
+    try:
+        output = subprocess.run(
+            [git_executable, '--version'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True
+        ).stdout.decode('utf-8', 'replace')
+    except (OSError, subprocess.CalledProcessError):
+        return ()
+
+    match = re.search(r'(\d+)\.(\d+)', output)
+    if match is None or tuple(map(int, match.groups())) < _DIFF_MERGES_MIN_GIT_VERSION:
+        return ()
+    return ('--diff-merges=first-parent',)
+
+
+def _local_month_range(timestamp: int):
+    """
+    取得時間戳記所在的當地月份及該月份的時間範圍
+
+    Args:
+        timestamp: Unix 時間戳記
+
+    Returns:
+        (月份字串 YYYY-MM, 月初時間戳記, 下個月月初時間戳記)
+    """
+    local_time = time.localtime(timestamp)
+    year, month = local_time.tm_year, local_time.tm_mon
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    # 由 mktime 換算當地時間的月初（自動處理日光節約時間）
+    month_start = time.mktime((year, month, 1, 0, 0, 0, 0, 0, -1))
+    month_end = time.mktime((next_year, next_month, 1, 0, 0, 0, 0, 0, -1))
+    return f'{year:04d}-{month:02d}', month_start, month_end
 
 
 class GitAnalyzer:
@@ -15,7 +86,8 @@ class GitAnalyzer:
 
     def __init__(self, project_path: str, exclude_files: List[str] = None,
                  filter_authors: List[str] = None,
-                 start_commit: str = None, end_commit: str = None, progress_tracker=None):
+                 start_commit: str = None, end_commit: str = None, progress_tracker=None,
+                 exclude_match_mode: str = 'name'):
         """
         初始化 Git 分析器
 
@@ -26,22 +98,64 @@ class GitAnalyzer:
             start_commit: 起始 commit ID（較舊的節點）
             end_commit: 結束 commit ID（較新的節點）
             progress_tracker: 進度追蹤器實例
+            exclude_match_mode: 排除規則比對方式
+                （'name' 完整檔名、'contains' 路徑包含、'suffix' 路徑結尾）
         """
         self.project_path = Path(project_path)
         if not self.project_path.exists():
             raise ValueError(f"專案路徑不存在: {project_path}")
 
+        if exclude_match_mode not in _EXCLUDE_MATCH_MODES:
+            raise ValueError(f"不支援的排除比對方式: {exclude_match_mode}")
+
         try:
-            self.repo = Repo(project_path)
+            self.repo = self._get_repo(str(self.project_path.absolute()))
         except InvalidGitRepositoryError:
             raise ValueError(f"該路徑不是有效的 Git 倉庫: {project_path}")
 
         self.exclude_files = exclude_files or []
+        self.exclude_match_mode = exclude_match_mode
+        # 預先標準化排除規則（統一使用正斜線）
+        exclude_rules = (exclude.strip() for exclude in self.exclude_files)
+        self._exclude_file_names = frozenset(
+            exclude.replace('\\', '/') if '\\' in exclude else exclude
+            for exclude in exclude_rules if exclude
+        )
+        # 路徑包含比對編譯成單一正規表示式，路徑結尾比對使用 str.endswith 的 tuple 形式
+        self._exclude_file_re = (
+            re.compile('|'.join(map(re.escape, self._exclude_file_names)))
+            if self._exclude_file_names else None
+        )
+        self._exclude_file_suffixes = tuple(self._exclude_file_names)
+        # 同一檔案會在許多 commits 中重複出現，快取排除判斷結果
+        self._is_excluded_file_cached = lru_cache(maxsize=8192)(self._is_excluded_file)
         self.filter_authors = filter_authors or []
         self.start_commit = start_commit
         self.end_commit = end_commit
         self.progress_tracker = progress_tracker
 
+    @classmethod
+    @lru_cache(maxsize=8)
+    def _get_repo(cls, repo_path: str) -> Repo:
+        """
+        取得 Git 倉庫物件（同一路徑重複使用同一個物件）
+
+        分析只透過 repo.git 執行獨立的 git 指令，不共用 cat-file 等常駐行程，
+        因此可安全地在多個請求之間共用；解析實際路徑（symlink）也只在第一次進行
+
+        Args:
+            repo_path: 倉庫的絕對路徑
+
+        Returns:
+            Git 倉庫物件
+        """
+        return Repo(os.path.realpath(repo_path))
+
+    @classmethod
+    def clear_cache(cls):
+        """清除已快取的 Git 倉庫物件"""
+        cls._get_repo.cache_clear()
+
     def analyze(self, max_commits: int = 1000) -> Dict[str, Any]:
         """
         分析 Git 歷史
@@ -53,105 +167,106 @@ class GitAnalyzer:
             包含分析結果的字典
         """
         # 統計檔案異動次數
-        file_changes = defaultdict(int)
+        file_changes = Counter()
         commit_count = 0
         authors = set()
-        author_commits = defaultdict(int)  # 每個作者的 commit 數
+        author_commits = Counter()  # 每個作者的 commit 數
         author_timeline = defaultdict(lambda: defaultdict(int))  # 時間軸上的活躍度
         total_insertions = 0
         total_deletions = 0
 
         # 作者品質評估相關資料
         author_commit_details = defaultdict(list)  # 每個作者的 commit 詳細資訊
-        author_file_changes = defaultdict(lambda: defaultdict(int))  # 每個作者修改各檔案的次數
-        author_file_timeline = defaultdict(lambda: defaultdict(list))  # 每個作者對每個檔案的修改時間軸
+        author_file_changes = defaultdict(Counter)  # 每個作者修改各檔案的次數
+        # 每個作者對每個檔案的修改時間軸（只保存 commit 時間戳記，以 64 位元整數陣列緊密存放）
+        author_file_timeline = defaultdict(lambda: defaultdict(partial(array, 'q')))
 
         # 建立 commit 範圍
         commit_range = self._build_commit_range()
 
         # 先計算總 commit 數（用於進度顯示）
-        commits_list = list(self.repo.iter_commits(commit_range, max_count=max_commits))
-        total_commits = len(commits_list)
+        total_commits = self._count_commits(commit_range, max_commits)
 
-        # 遍歷 commits
-        for commit in commits_list:
-            author_name = commit.author.name
+        # 目前所在月份的範圍（相鄰 commits 通常落在同一個月，不必每次都換算日期）
+        month_key = None
+        month_start = month_end = 0
 
-            # 如果有指定作者過濾，只處理指定的作者
-            if self.filter_authors and not self._is_filtered_author(author_name):
-                continue
+        try:
+            # 以 git log 子行程串流遍歷 commits
+            for commit_info in self._iter_commits(commit_range, total_commits):
+                (hexsha, author_name, committed_date, message_length,
+                 diff_files, insertions, deletions) = commit_info
 
-            commit_count += 1
-            authors.add(author_name)
-            author_commits[author_name] += 1
-
-            # 記錄時間軸上的活躍度（按月份統計）
-            commit_date = datetime.fromtimestamp(commit.committed_date)
-            month_key = commit_date.strftime('%Y-%m')
-            author_timeline[author_name][month_key] += 1
-
-            # 統計每個 commit 的檔案變更
-            commit_files = []  # 本次 commit 涉及的檔案
-            if commit.parents:
-                parent = commit.parents[0]
-                diffs = parent.diff(commit)
-
-                for diff in diffs:
-                    # a_path 是舊檔案路徑，b_path 是新檔案路徑
-                    file_path = diff.b_path if diff.b_path else diff.a_path
-                    if file_path and not self._is_excluded_file(file_path):
-                        file_changes[file_path] += 1
-                        commit_files.append(file_path)
-                        # 記錄該作者修改此檔案
-                        author_file_changes[author_name][file_path] += 1
-                        # 記錄該作者對此檔案的修改時間軸
-                        author_file_timeline[author_name][file_path].append({
-                            'timestamp': commit.committed_date,
-                            'commit_hash': commit.hexsha[:7]
-                        })
+                # 如果有指定作者過濾，只處理指定的作者
+                if self.filter_authors and not self._is_filtered_author(author_name):
+                    continue
 
-                # 統計新增/刪除行數
-                try:
-                    stats = commit.stats.total
-                    total_insertions += stats.get('insertions', 0)
-                    total_deletions += stats.get('deletions', 0)
-                except:
-                    pass
-
-            # 記錄該作者的 commit 詳細資訊（用於品質評估）
-            author_commit_details[author_name].append({
-                'timestamp': commit.committed_date,
-                'message': commit.message.strip(),
-                'files_count': len(commit_files),
-                'files': commit_files
-            })
+                commit_count += 1
+                authors.add(author_name)
+                author_commits[author_name] += 1
 
-            # 更新進度
-            if self.progress_tracker:
-                # 每處理20個commits或最後一個commit時更新
-                if commit_count % 20 == 0 or commit_count == total_commits:
-                    progress_percentage = int(55 + (commit_count / total_commits * 40))  # 55-95%
-                    self.progress_tracker.update(
-                        "git_analysis",
-                        progress_percentage,
-                        100,
-                        f"正在分析 Git 歷史... ({commit_count}/{total_commits} commits)"
-                    )
-
-        # 排序檔案異動次數（由多到少）
-        sorted_files = sorted(
-            file_changes.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
+                # 記錄時間軸上的活躍度（按月份統計）
+                if not month_start <= committed_date < month_end:
+                    month_key, month_start, month_end = _local_month_range(committed_date)
+                author_timeline[author_name][month_key] += 1
+
+                # 統計每個 commit 的檔案變更（與第一個父節點比較，初始 commit 與空樹比較）
+                commit_files = [  # 本次 commit 涉及的檔案
+                    file_path for file_path in diff_files
+                    if file_path and not self._is_excluded_file_cached(file_path)
+                ]
+
+                # 整批累計檔案異動次數與該作者修改各檔案的次數
+                file_changes.update(commit_files)
+                author_file_changes[author_name].update(commit_files)
 
-        # 取前 50 個最常異動的檔案
+                # 記錄該作者對每個檔案的修改時間軸
+                file_timeline = author_file_timeline[author_name]
+                for file_path in commit_files:
+                    file_timeline[file_path].append(committed_date)
+
+                # 統計新增/刪除行數
+                total_insertions += insertions
+                total_deletions += deletions
+
+                # 記錄該作者的 commit 詳細資訊（用於品質評估）
+                author_commit_details[author_name].append({
+                    'timestamp': committed_date,
+                    'message_length': message_length,
+                    'insertions': insertions,
+                    'deletions': deletions,
+                    'files_count': len(commit_files),
+                    'files': commit_files
+                })
+
+                # 更新進度
+                if self.progress_tracker:
+                    # 每處理20個commits或最後一個commit時更新
+                    if commit_count % 20 == 0 or commit_count == total_commits:
+                        progress_percentage = int(55 + (commit_count / total_commits * 40))  # 55-95%
+                        self.progress_tracker.update(
+                            "git_analysis",
+                            progress_percentage,
+                            100,
+                            f"正在分析 Git 歷史... ({commit_count}/{total_commits} commits)",
+                            force=commit_count == total_commits
+                        )
+        finally:
+            # 釋放排除判斷快取（分析中途發生錯誤時也要釋放）
+            self._is_excluded_file_cached.cache_clear()
+
+        # git log 由新到舊輸出，反轉一次讓每個檔案的修改時間軸由舊到新
+        for file_timeline in author_file_timeline.values():
+            for timeline in file_timeline.values():
+                timeline.reverse()
+
+        # 取前 50 個最常異動的檔案（不需排序全部檔案）
         top_changed_files = [
             {
                 'filename': file_path,
                 'changes': count
             }
-            for file_path, count in sorted_files[:50]
+            for file_path, count in nlargest(50, file_changes.items(), key=lambda x: x[1])
         ]
 
         # 檔案異動頻率分佈
@@ -166,9 +281,7 @@ class GitAnalyzer:
             author_file_changes,
             author_file_timeline,
             file_changes,
-            commit_count,
-            total_insertions,
-            total_deletions
+            commit_count
         )
 
         return {
@@ -186,6 +299,200 @@ class GitAnalyzer:
             'author_quality_data': author_quality_data
         }
 
+    def _count_commits(self, commit_range: str, max_commits: int) -> int:
+        """
+        計算 commit 範圍內的 commit 數量（不建立 commit 物件）
+
+        Args:
+            commit_range: commit 範圍字串
+            max_commits: 最多分析的 commit 數量
+
+        Returns:
+            commit 數量
+        """
+        output = self.repo.git.rev_list(commit_range, '--', count=True, max_count=max_commits)
+        return int(output.strip() or 0)
+
+    def _iter_commits(self, commit_range: str, total_commits: int):
+        """
+        依序產出 commit 範圍內的 commits
+
+        commit 數量較多時，將範圍切成多段，各段由獨立的 git log 子行程同時計算差異，
+        再依原始順序產出；主要負載在 git 子行程中，因此使用執行緒即可平行處理
+
+        Args:
+            commit_range: commit 範圍字串
+            total_commits: 要分析的 commit 數量
+
+        Yields:
+            與 _iter_commits_raw 相同格式的 commit 資料
+        """
+        workers = min(os.cpu_count() or 1, total_commits // _MIN_COMMITS_PER_WORKER)
+        if workers <= 1:
+            yield from self._iter_commits_raw(commit_range, total_commits)
+            return
+
+        slice_size = -(-total_commits // workers)  # 無條件進位
+        with ThreadPoolExecutor(max_workers=workers - 1) as executor:
+            # 後續各段在背景執行緒中讀取並暫存
+            pending = [
+                executor.submit(lambda skip: list(self._iter_commits_raw(
+                    commit_range, min(slice_size, total_commits - skip), skip)), skip)
+                for skip in range(slice_size, total_commits, slice_size)
+            ]
+
+            # 第一段直接串流產出，不需暫存
+            yield from self._iter_commits_raw(commit_range, slice_size)
+
+            # 依序產出後續各段，產出後即釋放該段暫存的資料
+            while pending:
+                yield from pending.pop(0).result()
+
+    def _iter_commits_raw(self, commit_range: str, max_commits: int, skip: int = 0):
+        """
+        以單一 git log 子行程串流讀取 commits 及其異動檔案
+
+        Args:
+            commit_range: commit 範圍字串
+            max_commits: 最多分析的 commit 數量
+            skip: 略過前面的 commit 數量
+
+        Yields:
+            (commit hash, 作者名稱, commit 時間戳記, commit message 長度,
+             異動檔案路徑列表, 新增行數, 刪除行數)
+        """
+        # 使用 GitPython 設定的 git 執行檔（GIT_PYTHON_GIT_EXECUTABLE / git.refresh），git 不一定在 PATH 中
+        git_executable = Git.GIT_PYTHON_GIT_EXECUTABLE
+        merge_diff_args = _merge_diff_args(git_executable)
+        command = [
+            git_executable, '-C', str(self.project_path), 'log', commit_range,
+            f'--max-count={max_commits}', f'--skip={skip}', f'--format={_LOG_FORMAT}',
+            # 不論使用者的 i18n.logOutputEncoding 設定為何，一律以 UTF-8 輸出
+            '--encoding=UTF-8', '--no-color', '-z', '--numstat', '-M',
+            # 不受 log.showSignature 設定影響，避免簽章訊息混入輸出
+            '--no-show-signature',
+            *merge_diff_args, '--root', '--'
+        ]
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        # 舊版 git 無法在 git log 中輸出 merge commit 與第一個父節點的差異
+        diff_merges = bool(merge_diff_args)
+
+        try:
+            tokens = self._read_log_tokens(process.stdout)
+            commit = None
+            files = []
+            insertions = 0
+            deletions = 0
+
+            for token in tokens:
+                token = token.lstrip(b'\n')
+
+                if token.startswith(b'\x01'):
+                    # commit 開頭：先送出上一個 commit，再依序讀取固定欄位
+                    if commit is not None:
+                        yield (*commit, files, insertions, deletions)
+                    hexsha = token[1:].decode('ascii')
+                    parents = next(tokens).split()
+                    author_name = next(tokens).decode('utf-8', 'replace')
+                    committed_date = int(next(tokens))
+                    # 只有 message 長度會用於品質評估，不保留 message 內容
+                    message_length = len(next(tokens).decode('utf-8', 'replace').strip())
+                    commit = (hexsha, author_name, committed_date, message_length)
+                    files = []
+                    insertions = 0
+                    deletions = 0
+
+                    if not diff_merges and len(parents) > 1:
+                        files, insertions, deletions = self._diff_first_parent(
+                            parents[0].decode('ascii'), hexsha)
+
+                elif token:
+                    # --numstat 異動項目："新增行數\t刪除行數\t檔案路徑"
+                    # 更名/複製時路徑欄位為空，之後接舊路徑與新路徑，取新路徑
+                    added, deleted, file_path = token.split(b'\t', 2)
+                    if not file_path:
+                        next(tokens)
+                        file_path = next(tokens)
+                    files.append(file_path.decode('utf-8', 'replace'))
+
+                    # 二進位檔案的行數為 "-"，不計入
+                    if added != b'-':
+                        insertions += int(added)
+                        deletions += int(deleted)
+
+            if commit is not None:
+                yield (*commit, files, insertions, deletions)
+
+            process.stdout.close()
+            stderr = process.stderr.read()
+            if process.wait() != 0:
+                raise GitCommandError(command, process.returncode, stderr)
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+    def _diff_first_parent(self, parent: str, hexsha: str):
+        """
+        計算 merge commit 與第一個父節點之間的異動（舊版 git 不支援 --diff-merges 時使用）
+
+        Args:
+            parent: 第一個父節點的 commit hash
+            hexsha: merge commit 的 hash
+
+        Returns:
+            (異動檔案路徑列表, 新增行數, 刪除行數)
+        """
+        command = [
+            Git.GIT_PYTHON_GIT_EXECUTABLE, '-C', str(self.project_path), 'diff',
+            '--no-color', '-z', '--numstat', '-M', '--no-show-signature', parent, hexsha, '--'
+        ]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise GitCommandError(command, result.returncode, result.stderr)
+
+        files = []
+        insertions = 0
+        deletions = 0
+        tokens = iter(result.stdout.split(b'\0'))
+        for token in tokens:
+            if not token:
+                continue
+            # 格式與 git log --numstat -z 相同（見 _iter_commits_raw）
+            added, deleted, file_path = token.split(b'\t', 2)
+            if not file_path:
+                next(tokens)
+                file_path = next(tokens)
+            files.append(file_path.decode('utf-8', 'replace'))
+            if added != b'-':
+                insertions += int(added)
+                deletions += int(deleted)
+
+        return files, insertions, deletions
+
+    def _read_log_tokens(self, stream):
+        """
+        以固定大小區塊讀取 git log -z 的輸出，並依 NUL 分割成欄位
+
+        Args:
+            stream: git log 子行程的標準輸出
+
+        Yields:
+            以 NUL 分隔的欄位（bytes）
+        """
+        pending = b''
+        while True:
+            chunk = stream.read(_LOG_READ_SIZE)
+            if not chunk:
+                break
+            fields = (pending + chunk).split(b'\0')
+            pending = fields.pop()
+            yield from fields
+
+        if pending:
+            yield pending
+
     def _get_change_distribution(self, file_changes: Dict[str, int]) -> Dict[str, int]:
         """
         計算檔案異動頻率分佈
@@ -219,21 +526,30 @@ class GitAnalyzer:
         """
         建立 commit 範圍字串
 
+        範圍端點會先解析成 commit hash，讓計數與各段 git log 子行程使用完全相同的範圍，
+        分析期間即使有新的 commit 也不會造成分段位置偏移
+
+        Returns:
+            commit 範圍字串，格式為 "start_commit..end_commit" 或 "end_commit"（皆為 commit hash）
+        """
+        end_commit = self._resolve_commit(self.end_commit or "HEAD")
+        if self.start_commit:
+            # 指定起始點：從起始點（不含）到結束點
+            return f"{self._resolve_commit(self.start_commit)}..{end_commit}"
+        # 沒有起始點，從頭到結束點
+        return end_commit
+
+    def _resolve_commit(self, ref: str) -> str:
+        """
+        將分支、標籤或縮寫 hash 解析成完整的 commit hash
+
+        Args:
+            ref: commit 參照
+
         Returns:
-            commit 範圍字串，格式為 "start_commit..end_commit" 或 "HEAD"
-        """
-        if self.start_commit and self.end_commit:
-            # 指定範圍：從舊到新
-            return f"{self.start_commit}..{self.end_commit}"
-        elif self.start_commit:
-            # 只有起始點，從起始點到最新
-            return f"{self.start_commit}..HEAD"
-        elif self.end_commit:
-            # 只有結束點，從頭到結束點
-            return self.end_commit
-        else:
-            # 沒有指定範圍，分析所有 commits
-            return "HEAD"
+            完整的 commit hash
+        """
+        return self.repo.git.rev_parse(f"{ref}^{{commit}}", verify=True).strip()
 
     def _is_excluded_file(self, file_path: str) -> bool:
         """
@@ -245,34 +561,22 @@ class GitAnalyzer:
         Returns:
             True 如果該檔案應該被排除
         """
-        if not self.exclude_files:
+        if not self._exclude_file_names:
             return False
 
-        # 標準化路徑（統一使用正斜線）
-        normalized_path = file_path.replace('\\', '/')
-        file_name = os.path.basename(normalized_path)
+        # 標準化路徑（統一使用正斜線；git 輸出的路徑通常已是正斜線，不需轉換）
+        normalized_path = file_path.replace('\\', '/') if '\\' in file_path else file_path
 
-        # 檢查是否在排除列表中
-        for exclude in self.exclude_files:
-            exclude = exclude.strip()
-            if not exclude:
-                continue
-
-            # 標準化排除規則
-            exclude_normalized = exclude.replace('\\', '/')
+        # 路徑包含匹配
+        if self.exclude_match_mode == 'contains':
+            return self._exclude_file_re.search(normalized_path) is not None
 
-            # 支援三種匹配方式：
-            # 1. 完整檔名匹配
-            if exclude_normalized == file_name:
-                return True
-            # 2. 路徑包含匹配（支援部分路徑）
-            #if exclude_normalized in normalized_path:
-            #    return True
-            # 3. 路徑結尾匹配（例如 "/config.json" 匹配 "src/config.json"）
-            #if normalized_path.endswith(exclude_normalized):
-            #    return True
+        # 路徑結尾匹配
+        if self.exclude_match_mode == 'suffix':
+            return normalized_path.endswith(self._exclude_file_suffixes)
 
-        return False
+        # 完整檔名匹配
+        return os.path.basename(normalized_path) in self._exclude_file_names
 
     def _is_filtered_author(self, author_name: str) -> bool:
         """
@@ -322,12 +626,18 @@ class GitAnalyzer:
         all_months = sorted(list(all_months))
 
         # 構建每個作者的時間序列資料
+        # 先建立全為 0 的列，再依月份索引填入該作者有 commit 的月份
+        month_index = {month: i for i, month in enumerate(all_months)}
         timeline_data = []
         for author, commits in sorted_authors:
+            timeline = [0] * len(all_months)
+            for month, count in author_timeline[author].items():
+                timeline[month_index[month]] = count
+
             author_data = {
                 'author': author,
                 'total_commits': commits,
-                'timeline': [author_timeline[author].get(month, 0) for month in all_months]
+                'timeline': timeline
             }
             timeline_data.append(author_data)
 
@@ -338,38 +648,49 @@ class GitAnalyzer:
 
     def _prepare_author_quality_data(self, author_commit_details: Dict[str, List[Dict]],
                                       author_file_changes: Dict[str, Dict[str, int]],
-                                      author_file_timeline: Dict[str, Dict[str, List[Dict]]],
+                                      author_file_timeline: Dict[str, Dict[str, array]],
                                       all_file_changes: Dict[str, int],
-                                      total_commits: int,
-                                      total_insertions: int,
-                                      total_deletions: int) -> Dict[str, Any]:
+                                      total_commits: int) -> Dict[str, Any]:
         """
         準備作者品質評估所需的資料
 
         Args:
             author_commit_details: 每個作者的 commit 詳細資訊
             author_file_changes: 每個作者修改各檔案的次數
-            author_file_timeline: 每個作者對每個檔案的修改時間軸
+            author_file_timeline: 每個作者對每個檔案的修改時間戳記
             all_file_changes: 所有檔案的異動次數
             total_commits: 總 commit 數
-            total_insertions: 總插入行數
-            total_deletions: 總刪除行數
 
         Returns:
             作者品質評估資料
         """
         author_data = {}
 
+        # 所有作者使用同一個基準時間計算距離最近一次 commit 的天數
+        current_time = time.time()
+
+        # 熱點檔案（Top 20% 高異動檔案）與作者無關，只需計算一次
+        total_files = len(all_file_changes)
+        top_20_percent_count = max(1, int(total_files * 0.2))
+        top_hotspot_files = set(
+            file_path for file_path, _ in
+            nlargest(top_20_percent_count, all_file_changes.items(), key=lambda x: x[1])
+        )
+
         for author, commits in author_commit_details.items():
             if not commits:
                 continue
 
-            # 排序 commits 按時間
-            sorted_commits = sorted(commits, key=lambda x: x['timestamp'])
+            # 一次走訪找出最早與最晚的 commit 時間（不需排序全部 commits）
+            first_commit_time = last_commit_time = commits[0]['timestamp']
+            for commit in commits:
+                timestamp = commit['timestamp']
+                if timestamp < first_commit_time:
+                    first_commit_time = timestamp
+                elif timestamp > last_commit_time:
+                    last_commit_time = timestamp
 
             # 計算時間跨度（天數）
-            first_commit_time = sorted_commits[0]['timestamp']
-            last_commit_time = sorted_commits[-1]['timestamp']
             active_days = max(1, (last_commit_time - first_commit_time) / 86400)  # 轉換為天數
 
             # 計算平均每 commit 修改檔案數
@@ -377,14 +698,12 @@ class GitAnalyzer:
             avg_files_per_commit = total_files_in_commits / len(commits) if len(commits) > 0 else 0
 
             # 計算平均 commit message 長度
-            avg_message_length = sum(len(c['message']) for c in commits) / len(commits) if len(commits) > 0 else 0
+            avg_message_length = sum(c['message_length'] for c in commits) / len(commits) if len(commits) > 0 else 0
 
             # 計算平均 commit 間隔（天）
             avg_commit_interval = active_days / len(commits) if len(commits) > 1 else active_days
 
             # 計算距離最近一次 commit 的天數（用於活躍度評估）
-            import time
-            current_time = time.time()
             days_since_last_commit = (current_time - last_commit_time) / 86400
 
             # 計算該作者修改的檔案數
@@ -392,32 +711,19 @@ class GitAnalyzer:
 
             # 計算檔案修改集中度（Top 10 檔案佔比）
             author_files = author_file_changes[author]
-            sorted_author_files = sorted(author_files.values(), reverse=True)
-            top_10_changes = sum(sorted_author_files[:10]) if len(sorted_author_files) > 0 else 0
-            total_author_changes = sum(sorted_author_files) if len(sorted_author_files) > 0 else 1
+            top_10_changes = sum(nlargest(10, author_files.values()))
+            total_author_changes = sum(author_files.values()) if author_files else 1
             file_concentration = (top_10_changes / total_author_changes * 100) if total_author_changes > 0 else 0
 
             # 計算熱點檔案參與度（修改 Top 20% 高異動檔案的次數）
-            total_files = len(all_file_changes)
-            top_20_percent_count = max(1, int(total_files * 0.2))
-            top_hotspot_files = set(sorted(all_file_changes.keys(), key=lambda x: all_file_changes[x], reverse=True)[:top_20_percent_count])
-
-            hotspot_changes = sum(1 for f in author_files.keys() if f in top_hotspot_files)
+            hotspot_changes = sum(1 for f in author_files if f in top_hotspot_files)
             hotspot_participation = (hotspot_changes / files_modified * 100) if files_modified > 0 else 0
 
             # 計算專案貢獻比例
             contribution_ratio = (len(commits) / total_commits * 100) if total_commits > 0 else 0
 
             # 計算程式碼變動量（該作者的總插入+刪除行數）
-            author_total_changes = 0
-            for commit in commits:
-                # 注意：這裡我們只能用全域的 total_insertions/deletions 來估算
-                # 實際上需要在 analyze() 中記錄每個作者的 insertions/deletions
-                pass
-            # 暫時使用作者的 commit 比例來估算
-            author_insertions = int(total_insertions * (len(commits) / total_commits)) if total_commits > 0 else 0
-            author_deletions = int(total_deletions * (len(commits) / total_commits)) if total_commits > 0 else 0
-            author_total_changes = author_insertions + author_deletions
+            author_total_changes = sum(c['insertions'] + c['deletions'] for c in commits)
 
             # 計算快速返工比例（5天內反覆修改同一檔案）
             rapid_rework_count = 0  # 5天內的快速修改次數
@@ -429,17 +735,19 @@ class GitAnalyzer:
                     # 只改過1次，不計入
                     continue
 
-                # 按時間排序
-                sorted_timeline = sorted(timeline, key=lambda x: x['timestamp'])
+                # 計算連續修改之間的時間間隔（秒）
+                intervals = [later - earlier for earlier, later in zip(timeline, timeline[1:])]
+
+                # analyze() 已將時間軸整理為由舊到新，只有 commit 時間不依序
+                # （例如時鐘偏差）時才需要排序後重新計算
+                if min(intervals) < 0:
+                    sorted_timeline = sorted(timeline)
+                    intervals = [later - earlier for earlier, later in zip(sorted_timeline, sorted_timeline[1:])]
 
-                # 計算連續修改之間的時間間隔
-                for i in range(len(sorted_timeline) - 1):
-                    days_diff = (sorted_timeline[i+1]['timestamp'] - sorted_timeline[i]['timestamp']) / 86400
-                    total_file_modifications += 1
+                total_file_modifications += len(intervals)
 
-                    # 5天內視為快速返工（同一天也算，因為可能是測試發現問題）
-                    if days_diff <= 5:
-                        rapid_rework_count += 1
+                # 5天內視為快速返工（同一天也算，因為可能是測試發現問題）
+                rapid_rework_count += sum(interval <= _RAPID_REWORK_SECONDS for interval in intervals)
 
             # 計算快速返工比例
             rapid_rework_ratio = (rapid_rework_count / total_file_modifications * 100) if total_file_modifications > 0 else 0
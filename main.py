@@ -5,24 +5,34 @@ FastAPI 主程式
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, StreamingResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Dict, Any, List, Optional
 import os
 import sys
 import json
 import asyncio
+import time
 from pathlib import Path
-from queue import Queue
 import threading
 from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from functools import lru_cache
 
-from code_analyzer import CodeAnalyzer
+from code_analyzer import CodeAnalyzer, shutdown_executor
 from git_analyzer import GitAnalyzer
-from progress_tracker import ProgressTracker, ProgressUpdate
+from progress_tracker import ProgressTracker, ProgressUpdate, ProgressAggregator, FINAL_STAGES
 from config_manager import ConfigManager
 from author_quality_scorer import AuthorQualityScorer
 
+# orjson 為選用套件，未安裝時使用標準函式庫的 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
+
+@lru_cache(maxsize=None)
 def get_resource_path(relative_path: str) -> Path:
     """
     取得資源檔案的絕對路徑（支援 PyInstaller 打包）
@@ -42,24 +52,157 @@ def get_resource_path(relative_path: str) -> Path:
 
     return base_path / relative_path
 
+
+def encode_sse_data(data: Any) -> bytes:
+    """
+    將資料編碼為 SSE data 訊框
+
+    Args:
+        data: 要傳送的資料
+
+    Returns:
+        SSE 訊框位元組
+    """
+    if orjson is not None:
+        return b"data: " + orjson.dumps(data) + b"\n\n"
+    return f"data: {json.dumps(data)}\n\n".encode('utf-8')
+
+
+def progress_to_dict(progress: ProgressUpdate) -> Dict[str, Any]:
+    """
+    將進度更新轉換為 SSE 傳送的資料格式
+
+    Args:
+        progress: 進度更新
+
+    Returns:
+        進度資料字典
+    """
+    total = progress.total
+    return {
+        "stage": progress.stage,
+        "current": progress.current,
+        "total": total,
+        "message": progress.message,
+        "percentage": progress.current * 100 // total if total > 0 else 0,
+        "timestamp": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(progress.timestamp))
+    }
+
+
+# 靜態檔案資料夾與首頁檔案路徑（啟動時解析一次）
+STATIC_PATH = str(get_resource_path("static"))
+INDEX_PATH = str(get_resource_path("static/index.html"))
+
+# 進度會話的存活時間、清理間隔（秒）與數量上限
+# （用戶端沒有連線 SSE 串流時，會話不會被串流清除，需定期回收）
+PROGRESS_SESSION_TTL = 600
+PROGRESS_SESSION_REAP_INTERVAL = 60
+MAX_PROGRESS_SESSIONS = 1024
+
+
+@dataclass
+class ProgressSession:
+    """分析會話的進度狀態"""
+    __slots__ = ('queue', 'done', 'last_active', 'in_flight')
+
+    queue: asyncio.Queue  # 進度更新佇列（由事件迴圈放入，SSE 串流取出）
+    done: asyncio.Event  # 分析是否已結束（結束後佇列不會再有新的進度）
+    last_active: float  # 建立、最後收到進度或分析結束的時間（time.monotonic）
+    in_flight: bool  # 分析請求是否已認領此會話且尚未結束（含等待號誌中）
+
+
+async def reap_progress_sessions():
+    """定期移除超過存活時間、且未被分析請求認領或已分析結束的進度會話"""
+    while True:
+        await asyncio.sleep(PROGRESS_SESSION_REAP_INTERVAL)
+        deadline = time.monotonic() - PROGRESS_SESSION_TTL
+        for session_id, session in list(progress_sessions.items()):
+            # 排隊等待號誌或分析中的會話可能長時間沒有進度，不可回收
+            if not session.in_flight and session.last_active < deadline:
+                del progress_sessions[session_id]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """應用程式啟動時開始清理進度會話，關閉時停止並關閉程式碼分析的子行程池"""
+    reaper = asyncio.create_task(reap_progress_sessions())
+    try:
+        yield
+    finally:
+        reaper.cancel()
+        shutdown_executor()
+
+
 app = FastAPI(
     title="程式碼分析工具",
     description="分析專案程式碼規模、複雜度與 Git 版本控制資訊",
-    version="2.4.0"
+    version="2.4.0",
+    lifespan=lifespan
 )
 
-# 全域進度佇列和執行緒池
-progress_queues: Dict[str, Queue] = {}
-executor = ThreadPoolExecutor(max_workers=4)
+# 同時執行的完整分析數量上限，以及額外允許排隊等待的請求數
+ANALYZE_CONCURRENCY = int(os.environ.get("ANALYZE_CONCURRENCY", "4"))
+ANALYZE_QUEUE_LIMIT = int(os.environ.get("ANALYZE_QUEUE_LIMIT", "16"))
+
+# 全域進度會話（只在事件迴圈中存取）和執行緒池
+progress_sessions: Dict[str, ProgressSession] = {}
+executor = ThreadPoolExecutor(max_workers=ANALYZE_CONCURRENCY, thread_name_prefix="analyze")
+
+# 限制同時分析數量的號誌（需在事件迴圈中建立，於第一次請求時初始化）
+analyze_semaphore: Optional[asyncio.Semaphore] = None
+analyze_waiting = 0  # 正在等待號誌的請求數
+
+# SSE 串流在沒有進度更新時送出心跳註解的間隔（秒），避免代理伺服器中斷閒置連線
+SSE_HEARTBEAT_INTERVAL = 15
+
+# 每個 SSE 訊框最多合併的進度更新數
+SSE_BATCH_SIZE = 16
 
 # 設定管理器實例
 config_manager = ConfigManager()
 
 
-class AnalyzeRequest(BaseModel):
-    """分析請求模型"""
+def get_progress_session(session_id: str) -> ProgressSession:
+    """
+    取得分析會話的進度狀態，不存在時建立（分析端點與 SSE 端點先到者建立）
+
+    Args:
+        session_id: 分析會話 ID
+
+    Returns:
+        進度會話
+    """
+    session = progress_sessions.get(session_id)
+    if session is not None:
+        return session
+
+    if len(progress_sessions) >= MAX_PROGRESS_SESSIONS:
+        raise HTTPException(status_code=503, detail="目前進行中的分析會話過多，請稍後再試")
+
+    session = ProgressSession(
+        queue=asyncio.Queue(), done=asyncio.Event(), last_active=time.monotonic(), in_flight=False
+    )
+    progress_sessions[session_id] = session
+    return session
+
+
+def release_progress_session(session_id: str, session: ProgressSession):
+    """
+    移除分析會話（只在仍是同一個會話時移除）
+
+    Args:
+        session_id: 分析會話 ID
+        session: 要移除的進度會話
+    """
+    if progress_sessions.get(session_id) is session:
+        del progress_sessions[session_id]
+
+
+class AnalysisSettings(BaseModel):
+    """分析設定模型（分析請求與儲存設定共用）"""
+    model_config = ConfigDict(str_strip_whitespace=True)
+
     project_path: str
-    session_id: Optional[str] = None  # 會話 ID（用於進度追蹤）
     exclude_folders: Optional[List[str]] = None  # 排除的資料夾列表（程式碼分析）
     exclude_code_files: Optional[List[str]] = None  # 排除的檔案列表（程式碼分析）
     exclude_git_files: Optional[List[str]] = None  # 排除的檔案列表（Git 分析）
@@ -69,11 +212,15 @@ class AnalyzeRequest(BaseModel):
     max_commits: Optional[int] = 1000  # Git 最大分析 commit 數量
 
 
+class AnalyzeRequest(AnalysisSettings):
+    """分析請求模型"""
+    session_id: Optional[str] = None  # 會話 ID（用於進度追蹤）
+
+
 @app.get("/")
 async def root():
     """首頁"""
-    index_path = get_resource_path("static/index.html")
-    return FileResponse(str(index_path))
+    return FileResponse(INDEX_PATH)
 
 
 @app.get("/api/progress/{session_id}")
@@ -87,40 +234,43 @@ async def progress_stream(session_id: str):
     Returns:
         Server-Sent Events 串流
     """
-    async def event_generator():
-        # 建立進度佇列
-        if session_id not in progress_queues:
-            progress_queues[session_id] = Queue()
-
-        queue = progress_queues[session_id]
+    # 取得進度會話（分析可能已開始或已結束，已放入佇列的進度會依序送出）
+    session = get_progress_session(session_id)
+    queue = session.queue
 
+    async def event_generator():
         try:
-            while True:
-                # 檢查佇列中是否有新的進度更新
-                if not queue.empty():
-                    progress: ProgressUpdate = queue.get()
-
-                    # 轉換為 SSE 格式
-                    data = {
-                        "stage": progress.stage,
-                        "current": progress.current,
-                        "total": progress.total,
-                        "message": progress.message,
-                        "percentage": int((progress.current / progress.total * 100) if progress.total > 0 else 0),
-                        "timestamp": progress.timestamp
-                    }
-
-                    yield f"data: {json.dumps(data)}\n\n"
-
-                    # 如果是完成訊息，結束串流
-                    if progress.stage == "completed" or progress.stage == "error":
+            # 分析結束且佇列已讀完時結束串流
+            while not (session.done.is_set() and queue.empty()):
+                # 等待下一個進度更新，逾時則送出心跳
+                try:
+                    progress: ProgressUpdate = await asyncio.wait_for(
+                        queue.get(), timeout=SSE_HEARTBEAT_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    # 會話已逾時被回收，不會再有進度更新
+                    if progress_sessions.get(session_id) is not session:
                         break
+                    yield b": ping\n\n"
+                    continue
+
+                # 收到進度更新，延長會話的存活時間
+                session.last_active = time.monotonic()
 
-                await asyncio.sleep(0.1)  # 避免 CPU 過度使用
+                # 一併取出佇列中已累積的進度，合併成單一訊框（JSON 陣列）送出
+                batch = [progress]
+                while (len(batch) < SSE_BATCH_SIZE and batch[-1].stage not in FINAL_STAGES
+                       and not queue.empty()):
+                    batch.append(queue.get_nowait())
+
+                yield encode_sse_data([progress_to_dict(item) for item in batch])
+
+                # 如果是完成訊息，結束串流
+                if batch[-1].stage in FINAL_STAGES:
+                    break
         finally:
-            # 清理佇列
-            if session_id in progress_queues:
-                del progress_queues[session_id]
+            # 清理會話
+            release_progress_session(session_id, session)
 
     return StreamingResponse(
         event_generator(),
@@ -190,14 +340,15 @@ async def analyze_git(request: AnalyzeRequest) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"分析失敗: {str(e)}")
 
 
-def run_analysis_sync(request: AnalyzeRequest, session_id: str) -> Dict[str, Any]:
+def run_analysis_sync(request: AnalyzeRequest, session: Optional[ProgressSession],
+                      loop: asyncio.AbstractEventLoop) -> Dict[str, Any]:
     """
     同步執行分析（在背景執行緒中執行）
     """
-    # 建立進度追蹤器
+    # 建立進度追蹤器（asyncio.Queue 不是執行緒安全的，需交由事件迴圈放入進度）
     def progress_callback(progress: ProgressUpdate):
-        if session_id and session_id in progress_queues:
-            progress_queues[session_id].put(progress)
+        if session is not None:
+            loop.call_soon_threadsafe(session.queue.put_nowait, progress)
 
     tracker = ProgressTracker(callback=progress_callback)
 
@@ -205,42 +356,62 @@ def run_analysis_sync(request: AnalyzeRequest, session_id: str) -> Dict[str, Any
         # 初始化進度
         tracker.update("init", 0, 100, "開始分析...")
 
-        # 程式碼分析
-        tracker.update("code_analysis", 10, 100, "正在分析程式碼...")
+        # 程式碼分析與 Git 分析互不相依，同時執行並合併兩者的進度（10-95%）
+        progress = ProgressAggregator(tracker, "processing", 10, 95)
+
         code_analyzer = CodeAnalyzer(
             request.project_path,
             exclude_folders=request.exclude_folders,
             exclude_files=request.exclude_code_files,
-            progress_tracker=tracker
+            progress_tracker=progress.add("code_analysis", 10, 50)
         )
-        code_result = code_analyzer.analyze()
-        tracker.update("code_analysis", 50, 100, "程式碼分析完成")
 
         # Git 分析（如果是 Git 倉庫）
+        # 先檢查 .git 是否存在（資料夾或 worktree 的 .git 檔案），不是 Git 倉庫時不必建立 GitAnalyzer
+        git_analyzer = None
+        if (Path(request.project_path) / ".git").exists():
+            try:
+                git_analyzer = GitAnalyzer(
+                    request.project_path,
+                    exclude_files=request.exclude_git_files,
+                    filter_authors=request.filter_authors,
+                    start_commit=request.start_commit,
+                    end_commit=request.end_commit
+                )
+            except ValueError:
+                # .git 無效，跳過 Git 分析
+                git_analyzer = None
+            else:
+                # 建立成功後才加入 Git 進度，避免未執行的工作拉低整體進度
+                git_analyzer.progress_tracker = progress.add("git_analysis", 55, 95)
+
         git_result = None
         author_quality_scores = None
-        try:
-            tracker.update("git_analysis", 55, 100, "正在分析 Git 歷史...")
-            git_analyzer = GitAnalyzer(
-                request.project_path,
-                exclude_files=request.exclude_git_files,
-                filter_authors=request.filter_authors,
-                start_commit=request.start_commit,
-                end_commit=request.end_commit,
-                progress_tracker=tracker
-            )
-            git_result = git_analyzer.analyze(max_commits=request.max_commits or 1000)
-            tracker.update("git_analysis", 95, 100, "Git 分析完成")
-
-            # 計算作者品質評分
-            if git_result and 'author_quality_data' in git_result:
-                tracker.update("quality_scoring", 97, 100, "正在計算作者品質評分...")
-                scorer = AuthorQualityScorer()
-                author_quality_scores = scorer.calculate_scores(git_result['author_quality_data'])
-                tracker.update("quality_scoring", 99, 100, "品質評分完成")
-        except ValueError:
-            # 不是 Git 倉庫，跳過 Git 分析
+        if git_analyzer is None:
+            tracker.update("code_analysis", 10, 100, "正在分析程式碼...")
+            code_result = code_analyzer.analyze()
             tracker.update("git_analysis", 95, 100, "專案不是 Git 倉庫，跳過 Git 分析")
+        else:
+            tracker.update("processing", 10, 100, "正在分析程式碼與 Git 歷史...")
+            # Git 分析在另一個執行緒中進行，程式碼分析直接在目前執行緒進行
+            # （不使用共用的 executor，避免佔滿工作執行緒時互相等待）
+            with ThreadPoolExecutor(max_workers=1) as git_executor:
+                git_future = git_executor.submit(
+                    git_analyzer.analyze, max_commits=request.max_commits or 1000
+                )
+                code_result = code_analyzer.analyze()
+                git_result = git_future.result()
+            tracker.update("processing", 95, 100, "程式碼與 Git 分析完成", force=True)
+
+        # 計算作者品質評分
+        if git_result and 'author_quality_data' in git_result:
+            tracker.update("quality_scoring", 97, 100, "正在計算作者品質評分...")
+            scorer = AuthorQualityScorer()
+            author_quality_scores = [
+                author_score.as_dict()
+                for author_score in scorer.calculate_scores(git_result['author_quality_data'])
+            ]
+            tracker.update("quality_scoring", 99, 100, "品質評分完成", force=True)
 
         tracker.update("completed", 100, 100, "分析完成！")
 
@@ -265,22 +436,41 @@ async def analyze_all(request: AnalyzeRequest) -> Dict[str, Any]:
     Returns:
         完整分析結果
     """
+    global analyze_semaphore, analyze_waiting
+
     session_id = request.session_id
 
-    try:
-        # 初始化進度佇列
-        if session_id:
-            if session_id not in progress_queues:
-                progress_queues[session_id] = Queue()
+    if analyze_semaphore is None:
+        analyze_semaphore = asyncio.Semaphore(ANALYZE_CONCURRENCY)
 
+    # 執行中的分析已達上限且排隊的請求過多時，直接拒絕而不是無限排隊
+    if analyze_semaphore.locked() and analyze_waiting >= ANALYZE_QUEUE_LIMIT:
+        raise HTTPException(status_code=429, detail="目前分析請求過多，請稍後再試")
+
+    # 取得進度會話
+    session = get_progress_session(session_id) if session_id else None
+    if session is not None:
+        session.in_flight = True
+
+    try:
         # 在執行緒池中執行分析
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            executor,
-            run_analysis_sync,
-            request,
-            session_id
-        )
+        analyze_waiting += 1
+        try:
+            await analyze_semaphore.acquire()
+        finally:
+            analyze_waiting -= 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                executor,
+                run_analysis_sync,
+                request,
+                session,
+                loop
+            )
+        finally:
+            analyze_semaphore.release()
 
         return {
             "status": "success",
@@ -290,6 +480,13 @@ async def analyze_all(request: AnalyzeRequest) -> Dict[str, Any]:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"分析失敗: {str(e)}")
+    finally:
+        # 標記分析結束；會話保留到串流讀完剩餘進度或逾時回收，
+        # 讓晚連線的串流仍能收到完整進度
+        if session is not None:
+            session.in_flight = False
+            session.last_active = time.monotonic()
+            session.done.set()
 
 
 @app.get("/api/health")
@@ -316,16 +513,8 @@ async def get_config():
         raise HTTPException(status_code=500, detail=f"讀取設定失敗: {str(e)}")
 
 
-class SaveConfigRequest(BaseModel):
+class SaveConfigRequest(AnalysisSettings):
     """儲存設定請求模型"""
-    project_path: str
-    exclude_folders: Optional[List[str]] = None
-    exclude_code_files: Optional[List[str]] = None
-    exclude_git_files: Optional[List[str]] = None
-    filter_authors: Optional[List[str]] = None
-    start_commit: Optional[str] = None
-    end_commit: Optional[str] = None
-    max_commits: Optional[int] = 1000
 
 
 @app.post("/api/config")
@@ -373,6 +562,10 @@ async def clear_config():
     """
     try:
         success = config_manager.clear_config()
+
+        # 設定清除後，已快取的 Git 倉庫物件也一併釋放
+        GitAnalyzer.clear_cache()
+
         if success:
             return {
                 "status": "success",
@@ -384,17 +577,20 @@ async def clear_config():
         raise HTTPException(status_code=500, detail=f"清除設定失敗: {str(e)}")
 
 
-# 掛載靜態檔案
-static_path = get_resource_path("static")
-if static_path.exists():
-    app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
+# 掛載靜態檔案（資料夾已在此確認存在，StaticFiles 不需再檢查）
+if os.path.isdir(STATIC_PATH):
+    app.mount("/static", StaticFiles(directory=STATIC_PATH, check_dir=False), name="static")
 
 
 if __name__ == "__main__":
+    import multiprocessing
     import uvicorn
     import webbrowser
     import threading
 
+    # PyInstaller 打包後，程式碼分析的子行程需要此呼叫才能正確啟動
+    multiprocessing.freeze_support()
+
     # 伺服器設定
     host = "127.0.0.1"
     port = 8000
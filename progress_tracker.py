@@ -2,36 +2,56 @@
 進度追蹤模組
 用於追蹤和回報分析進度
 """
-from typing import Optional, Callable
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Callable, Tuple
 from dataclasses import dataclass
-from datetime import datetime
 
 
-@dataclass
+# 結束階段：進度一定會送出不做合併，SSE 串流送出後即結束
+FINAL_STAGES = ('completed', 'error')
+
+# 同一階段兩次送出進度的最短間隔（秒）
+_MIN_EMIT_INTERVAL = 0.05
+
+# 保留進度歷程時最多保留的筆數
+_HISTORY_SIZE = 1024
+
+
+@dataclass(frozen=True)
 class ProgressUpdate:
-    """進度更新資料"""
+    """進度更新資料（建立後不可修改，可安全地在執行緒之間傳遞）"""
+    __slots__ = ('stage', 'current', 'total', 'message', 'timestamp')
+
     stage: str  # 階段名稱：'code_analysis', 'git_analysis', 'processing'
     current: int  # 當前進度
     total: int  # 總數
     message: str  # 詳細訊息
-    timestamp: str  # 時間戳記
+    timestamp: float  # 時間戳記（Unix 秒數，送出時才格式化）
 
 
 class ProgressTracker:
     """進度追蹤器"""
 
-    def __init__(self, callback: Optional[Callable] = None):
+    def __init__(self, callback: Optional[Callable] = None, keep_history: bool = False):
         """
         初始化進度追蹤器
 
         Args:
             callback: 進度更新回調函數
+            keep_history: 是否保留最近送出的進度更新（除錯用）
         """
         self.callback = callback
         self.current_stage = None
-        self.updates = []
+        self.updates = deque(maxlen=_HISTORY_SIZE) if keep_history else None
+
+        # 上一次送出的進度（用於合併重複的進度更新）
+        self._last_stage = None
+        self._last_percentage = -1
+        self._last_emit = 0.0
 
-    def update(self, stage: str, current: int, total: int, message: str):
+    def update(self, stage: str, current: int, total: int, message: str, force: bool = False):
         """
         更新進度
 
@@ -40,17 +60,32 @@ class ProgressTracker:
             current: 當前進度
             total: 總數
             message: 詳細訊息
+            force: 是否一定送出（階段的最後一筆進度不可被合併，否則前端停在中途的數字）
         """
+        # 前端只顯示整數百分比，同一階段百分比未變或間隔過短的更新直接略過
+        # （已達總數或指定一定送出的更新除外）
+        percentage = current * 100 // total if total > 0 else 0
+        now = time.monotonic()
+        if (not force and current < total and stage == self._last_stage
+                and stage not in FINAL_STAGES):
+            if percentage == self._last_percentage or now - self._last_emit < _MIN_EMIT_INTERVAL:
+                return
+
+        self._last_stage = stage
+        self._last_percentage = percentage
+        self._last_emit = now
+
         progress = ProgressUpdate(
             stage=stage,
             current=current,
             total=total,
             message=message,
-            timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            timestamp=time.time()
         )
 
         self.current_stage = stage
-        self.updates.append(progress)
+        if self.updates is not None:
+            self.updates.append(progress)
 
         # 呼叫回調函數
         if self.callback:
@@ -61,3 +96,71 @@ class ProgressTracker:
         if total == 0:
             return 0
         return int((current / total) * 100)
+
+
+class ProgressAggregator:
+    """
+    合併多個同時執行的工作進度
+
+    各工作使用 add() 取得的追蹤器回報進度（百分比範圍與單獨執行時相同），
+    這裡換算成各工作的完成比例後取平均，再對應到整體進度範圍送出
+    """
+
+    def __init__(self, tracker: ProgressTracker, stage: str, start: int, end: int):
+        """
+        初始化進度合併器
+
+        Args:
+            tracker: 送出整體進度的追蹤器
+            stage: 整體進度的階段名稱
+            start: 整體進度的起始百分比
+            end: 整體進度的結束百分比
+        """
+        self.tracker = tracker
+        self.stage = stage
+        self.start = start
+        self.end = end
+        self._ranges: Dict[str, Tuple[int, int]] = {}
+        self._fractions: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: int, end: int) -> ProgressTracker:
+        """
+        加入一個工作
+
+        Args:
+            name: 工作名稱
+            start: 該工作回報的起始百分比
+            end: 該工作回報的結束百分比
+
+        Returns:
+            供該工作回報進度的追蹤器
+        """
+        self._ranges[name] = (start, end)
+        self._fractions[name] = 0.0
+        return ProgressTracker(callback=lambda progress: self._on_update(name, progress))
+
+    def _on_update(self, name: str, progress: ProgressUpdate):
+        """
+        接收單一工作的進度並送出整體進度
+
+        Args:
+            name: 工作名稱
+            progress: 該工作的進度更新
+        """
+        start, end = self._ranges[name]
+        percentage = progress.current * 100 / progress.total if progress.total > 0 else 0
+        fraction = min(max((percentage - start) / (end - start), 0.0), 1.0)
+
+        # 各工作在不同執行緒中回報，需避免同時更新
+        with self._lock:
+            self._fractions[name] = fraction
+            overall = sum(self._fractions.values()) / len(self._fractions)
+            # 工作完成時的進度一定送出，避免最後的訊息被合併掉
+            self.tracker.update(
+                self.stage,
+                int(self.start + overall * (self.end - self.start)),
+                100,
+                progress.message,
+                force=fraction >= 1.0
+            )
@@ -131,12 +131,18 @@ function connectProgressStream(sessionId) {
     const eventSource = new EventSource(`/api/progress/${sessionId}`);
 
     eventSource.onmessage = (event) => {
-        const progress = JSON.parse(event.data);
-        updateProgressUI(progress);
+        // 每個訊框為一批進度更新（JSON 陣列），依序處理
+        const data = JSON.parse(event.data);
+        const updates = Array.isArray(data) ? data : [data];
 
-        // 如果完成或錯誤，關閉連接
-        if (progress.stage === 'completed' || progress.stage === 'error') {
-            eventSource.close();
+        for (const progress of updates) {
+            updateProgressUI(progress);
+
+            // 如果完成或錯誤，關閉連接
+            if (progress.stage === 'completed' || progress.stage === 'error') {
+                eventSource.close();
+                break;
+            }
         }
     };
 